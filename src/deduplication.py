@@ -1,11 +1,32 @@
 """Deduplication engine to prevent duplicate alerts."""
 
+import asyncio
+import heapq
 import logging
-from datetime import datetime, timedelta
-from typing import Dict
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Number of buffered admits merged into the expiry heap at once
+PENDING_FLUSH_THRESHOLD = 32
+
+
+def canonical_sku(sku: str) -> str:
+    """Return the canonical dedup key for a SKU or role name."""
+    return sku.strip().lower()
+
+
+@dataclass
+class AlertDecision:
+    """Result of a deduplication check."""
+
+    admit: bool
+    remaining_s: int = 0  # Seconds until the blocking window expires
+
 
 class DeduplicationEngine:
     """
@@ -15,74 +36,141 @@ class DeduplicationEngine:
     restock event, only one alert is sent.
     """
 
-    def __init__(self, window_minutes: int = 30):
+    def __init__(self, window_minutes: int = 30, max_entries: int = 10_000):
         """
         Initialize deduplication engine.
 
         Args:
             window_minutes: Time window in minutes. Same product won't alert
                           twice within this window. Set to 0 to disable.
+            max_entries: Maximum number of SKUs tracked at once. The least
+                        recently alerted SKUs are evicted beyond this.
         """
         self.window_minutes = window_minutes
-        self._last_alerts: Dict[str, datetime] = {}
-
-    def should_alert(self, product_sku: str) -> bool:
+        self.max_entries = max(1, max_entries)
+        self._window_seconds = window_minutes * 60.0
+
+        # SKU -> monotonic time at which the dedup window expires,
+        # ordered from least to most recently alerted
+        self._last_alerts: OrderedDict[str, float] = OrderedDict()
+        # Min-heap of (expiry, sku) so expired entries can be purged from the head
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # Recent admits not yet merged into the heap. The SKU map above is
+        # always current, so lookups never need to consult this buffer.
+        self._pending: List[Tuple[float, str]] = []
+
+        # Serializes check-and-record between Discord and store poller alerts
+        self._lock = asyncio.Lock()
+
+    def _flush_pending(self):
+        """Merge buffered admits into the expiry heap in one batch."""
+        pending = self._pending
+        if not pending:
+            return
+
+        heap = self._expiry_heap
+        # Rebuilding is O(heap), pushing is O(pending * log heap); only
+        # heapify when the batch is large relative to the heap
+        if len(heap) < 2 or len(pending) > len(heap) // math.log2(len(heap)):
+            heap.extend(pending)
+            heapq.heapify(heap)
+        else:
+            for entry in pending:
+                heapq.heappush(heap, entry)
+        pending.clear()
+
+    def _compact(self):
+        """Rebuild the expiry heap from live entries, dropping stale tuples."""
+        self._expiry_heap = [
+            (expiry, sku) for sku, expiry in self._last_alerts.items()
+        ]
+        heapq.heapify(self._expiry_heap)
+        self._pending.clear()
+
+    def _purge_expired(self, now: float):
+        """Drop all entries whose window has expired as of `now`."""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expiry, sku = heapq.heappop(heap)
+            # Skip stale heap entries left by clear(), eviction or a newer alert
+            if self._last_alerts.get(sku) == expiry:
+                del self._last_alerts[sku]
+
+    async def should_alert(self, sku: str) -> AlertDecision:
         """
         Check if an alert should be sent for this product.
 
         Args:
-            product_sku: The product SKU to check
+            sku: Product SKU to check, already passed through canonical_sku()
 
         Returns:
-            True if alert should be sent, False if duplicate
+            AlertDecision with admit=True if alert should be sent,
+            admit=False if duplicate
         """
-        if self.window_minutes <= 0:
+        if self._window_seconds <= 0:
             # Deduplication disabled
-            return True
+            return AlertDecision(admit=True)
+
+        async with self._lock:
+            now = time.monotonic()
+            if len(self._pending) >= PENDING_FLUSH_THRESHOLD:
+                self._flush_pending()
+            self._purge_expired(now)
+
+            # Entries still in the pending buffer may have expired unpurged,
+            # so compare against the stored expiry rather than membership
+            expiry = self._last_alerts.get(sku)
+            if expiry is not None and now < expiry:
+                remaining = int(expiry - now)
+                logger.info(
+                    "Duplicate alert suppressed for %s. Window expires in %ds",
+                    sku,
+                    remaining,
+                )
+                return AlertDecision(admit=False, remaining_s=remaining)
 
-        now = datetime.now()
-        sku_lower = product_sku.lower()
+            # Record this alert
+            expiry = now + self._window_seconds
+            self._last_alerts[sku] = expiry
+            self._last_alerts.move_to_end(sku)
+            self._pending.append((expiry, sku))
 
-        if sku_lower in self._last_alerts:
-            last_alert = self._last_alerts[sku_lower]
-            window = timedelta(minutes=self.window_minutes)
+            # Bound memory regardless of how many distinct SKUs we see
+            while len(self._last_alerts) > self.max_entries:
+                self._last_alerts.popitem(last=False)
 
-            if now - last_alert < window:
-                remaining = window - (now - last_alert)
-                logger.debug(
-                    f"Duplicate alert suppressed for {product_sku}. "
-                    f"Window expires in {remaining.seconds}s"
-                )
-                return False
+            # Evicted SKUs leave stale tuples behind in the heap and pending
+            # buffer; rebuild from the live entries once they pile up
+            if len(self._expiry_heap) + len(self._pending) > 2 * self.max_entries:
+                self._compact()
 
-        # Record this alert
-        self._last_alerts[sku_lower] = now
-        logger.debug(f"Alert allowed for {product_sku}")
-        return True
+        logger.debug("Alert allowed for %s", sku)
+        return AlertDecision(admit=True)
 
-    def clear(self, product_sku: str = None):
+    def clear(self, sku: str = None):
         """
         Clear alert history.
 
         Args:
-            product_sku: Specific SKU to clear, or None to clear all
+            sku: Specific SKU to clear, or None to clear all. Must already be
+                passed through canonical_sku(); "UTR" won't match "utr".
         """
-        if product_sku:
-            self._last_alerts.pop(product_sku.lower(), None)
-            logger.debug(f"Cleared dedup history for {product_sku}")
+        if sku:
+            # The matching heap entry is left in place and skipped when popped
+            self._last_alerts.pop(sku, None)
+            logger.debug("Cleared dedup history for %s", sku)
         else:
             self._last_alerts.clear()
+            self._expiry_heap.clear()
+            self._pending.clear()
             logger.debug("Cleared all dedup history")
 
     def get_status(self) -> Dict[str, str]:
         """Get current deduplication status for debugging."""
-        now = datetime.now()
-        status = {}
-        for sku, last_alert in self._last_alerts.items():
-            elapsed = now - last_alert
-            remaining = timedelta(minutes=self.window_minutes) - elapsed
-            if remaining.total_seconds() > 0:
-                status[sku] = f"blocked for {int(remaining.total_seconds())}s"
-            else:
-                status[sku] = "expired"
-        return status
+        now = time.monotonic()
+        self._flush_pending()
+        self._purge_expired(now)
+        return {
+            sku: f"blocked for {int(expiry - now)}s"
+            for sku, expiry in self._last_alerts.items()
+        }
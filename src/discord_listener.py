@@ -1,17 +1,43 @@
 """Discord self-bot listener for Ubiquiti stock alerts."""
 
 import asyncio
+import functools
 import logging
 import re
-from typing import Awaitable, Callable, List, Optional, Set
+import sys
+from types import MappingProxyType
+from typing import Awaitable, Callable, FrozenSet, List, Optional, Pattern, Tuple
 
 import discord
 
+from .deduplication import canonical_sku
+
 logger = logging.getLogger(__name__)
 
 # UbiquitiStockAlerts server ID
 UBIQUITI_STOCK_ALERTS_GUILD_ID = 1200139856194584797
 
+# Map of known SKUs (lowercase role names) to product names
+_SKU_TO_NAME = MappingProxyType({
+    "uvc-g6-180": "G6 180",
+    "uvc-g6-pro-entry": "G6 Pro Entry",
+    "utr": "UniFi Travel Router",
+})
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_patterns(role_name: str) -> Tuple[Pattern, Pattern]:
+    """
+    Compile the product name patterns for a role, once per role name.
+
+    Patterns match "Product Name (SKU)" and "Product Name - SKU".
+    """
+    escaped = re.escape(role_name)
+    return (
+        re.compile(rf"([^(@\n]+?)\s*\({escaped}\)", re.IGNORECASE),
+        re.compile(rf"([^-\n]+?)\s*-\s*{escaped}", re.IGNORECASE),
+    )
+
 
 class DiscordListener(discord.Client):
     """
@@ -24,7 +50,7 @@ class DiscordListener(discord.Client):
     def __init__(
         self,
         watched_roles: List[str],
-        on_stock_alert: Callable[[str, str, str], Awaitable[None]],
+        on_stock_alert: Callable[[str, str, str, str], Awaitable[None]],
         **kwargs,
     ):
         """
@@ -33,12 +59,15 @@ class DiscordListener(discord.Client):
         Args:
             watched_roles: List of role names to watch for (e.g., ["UVC-G6-180", "UTR"])
             on_stock_alert: Async callback when stock alert detected.
-                           Called with (product_name, product_sku, message_content)
+                           Called with (product_name, product_sku,
+                           sku_canonical, message_content)
         """
         # discord.py-self doesn't use Intents like regular discord.py
         super().__init__(**kwargs)
 
-        self.watched_roles: Set[str] = {role.lower() for role in watched_roles}
+        self.watched_roles: FrozenSet[str] = frozenset(
+            sys.intern(canonical_sku(role)) for role in watched_roles
+        )
         self.on_stock_alert = on_stock_alert
         self._start_task: Optional[asyncio.Task] = None
 
@@ -71,72 +100,77 @@ class DiscordListener(discord.Client):
     async def on_message(self, message: discord.Message):
         """Process incoming messages for stock alerts."""
         # Only process messages from UbiquitiStockAlerts
-        if not message.guild or message.guild.id != UBIQUITI_STOCK_ALERTS_GUILD_ID:
+        guild = message.guild
+        if guild is None or guild.id != UBIQUITI_STOCK_ALERTS_GUILD_ID:
+            return
+
+        watched = self.watched_roles
+
+        # Cheap reject before any logging: most messages mention no watched role.
+        # Role names are canonicalized once here and passed on as the SKU key.
+        matches = []
+        for role in message.role_mentions:
+            role_name_lower = sys.intern(canonical_sku(role.name))
+            if role_name_lower in watched:
+                matches.append((role, role_name_lower))
+        if not matches:
             return
 
         # Ignore our own messages
         if message.author == self.user:
             return
 
-        # Log all messages from UbiquitiStockAlerts for debugging
-        logger.info(
-            f"Message received - Channel: {message.channel.name}, "
-            f"Author: {message.author}, Roles mentioned: {[r.name for r in message.role_mentions]}"
-        )
-
-        # Check for role mentions
-        for role in message.role_mentions:
-            role_name_lower = role.name.lower()
+        # Log messages mentioning watched roles for debugging
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Message received - Channel: %s, Author: %s, Roles mentioned: %s",
+                message.channel.name,
+                message.author,
+                [r.name for r in message.role_mentions],
+            )
 
-            if role_name_lower in self.watched_roles:
-                logger.info(
-                    f"Stock alert detected! Role: {role.name}, "
-                    f"Channel: {message.channel.name}"
-                )
+        for role, sku_canonical in matches:
+            logger.info(
+                "Stock alert detected! Role: %s, Channel: %s",
+                role.name,
+                message.channel.name,
+            )
 
-                # Extract product info
-                product_name = self._extract_product_name(role.name, message.content)
-                product_sku = role.name  # Role name is typically the SKU
+            # Extract product info
+            product_name = self._extract_product_name(
+                role.name, sku_canonical, message.content
+            )
+            product_sku = role.name  # Role name is typically the SKU
 
-                # Trigger callback
-                try:
-                    await self.on_stock_alert(
-                        product_name, product_sku, message.content
-                    )
-                except Exception as e:
-                    logger.error(f"Error in stock alert callback: {e}")
+            # Trigger callback
+            try:
+                await self.on_stock_alert(
+                    product_name, product_sku, sku_canonical, message.content
+                )
+            except Exception as e:
+                logger.error(f"Error in stock alert callback: {e}")
 
-    def _extract_product_name(self, role_name: str, message_content: str) -> str:
+    def _extract_product_name(
+        self, role_name: str, role_lower: str, message_content: str
+    ) -> str:
         """
         Extract a human-readable product name from the message or role.
 
         Args:
             role_name: The Discord role name (usually SKU)
+            role_lower: The canonical (stripped, lowercased) role name
             message_content: The full message content
 
         Returns:
             Human-readable product name
         """
-        # Map of known SKUs to product names
-        sku_to_name = {
-            "uvc-g6-180": "G6 180",
-            "uvc-g6-pro-entry": "G6 Pro Entry",
-            "utr": "UniFi Travel Router",
-        }
-
-        role_lower = role_name.lower()
-        if role_lower in sku_to_name:
-            return sku_to_name[role_lower]
+        mapped = _SKU_TO_NAME.get(role_lower)
+        if mapped is not None:
+            return mapped
 
         # Try to extract from message using common patterns
-        # Pattern: "Product Name (SKU)" or "Product Name - SKU"
-        patterns = [
-            rf"([^(@\n]+?)\s*\({re.escape(role_name)}\)",
-            rf"([^-\n]+?)\s*-\s*{re.escape(role_name)}",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, message_content, re.IGNORECASE)
+        for pattern in _compile_patterns(role_name):
+            match = pattern.search(message_content)
             if match:
                 return match.group(1).strip()
 
@@ -151,7 +185,7 @@ class DiscordListener(discord.Client):
 async def create_discord_listener(
     token: str,
     watched_roles: List[str],
-    on_stock_alert: Callable[[str, str, str], Awaitable[None]],
+    on_stock_alert: Callable[[str, str, str, str], Awaitable[None]],
 ) -> DiscordListener:
     """
     Create and start a Discord listener.
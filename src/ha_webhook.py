@@ -10,15 +10,15 @@ logger = logging.getLogger(__name__)
 class HAWebhookClient:
     """Sends stock alerts to Home Assistant via webhook."""
 
-    def __init__(self, webhook_url: str, token: Optional[str] = None):
+    def __init__(
+        self,
+        webhook_url: str,
+        session: aiohttp.ClientSession,
+        token: Optional[str] = None,
+    ):
         self.webhook_url = webhook_url
         self.token = token
-        self._session: Optional[aiohttp.ClientSession] = None
-
-    async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
-        return self._session
+        self._session = session
 
     async def send_alert(
         self,
@@ -57,8 +57,7 @@ class HAWebhookClient:
             headers["Authorization"] = f"Bearer {self.token}"
 
         try:
-            session = await self._get_session()
-            async with session.post(
+            async with self._session.post(
                 self.webhook_url, json=payload, headers=headers, timeout=10
             ) as response:
                 if response.status == 200:
@@ -77,8 +76,3 @@ class HAWebhookClient:
         except Exception as e:
             logger.error(f"HA webhook unexpected error: {e}")
             return False
-
-    async def close(self):
-        """Close the HTTP session."""
-        if self._session and not self._session.closed:
-            await self._session.close()
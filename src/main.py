@@ -1,14 +1,22 @@
 """Main entry point for Ubiquiti Stock Alert Monitor."""
 
 import asyncio
+import copy
 import logging
 import signal
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
+import aiohttp
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    # libyaml not available, fall back to the pure-Python loader
+    from yaml import SafeLoader
+
 from .deduplication import DeduplicationEngine
 from .discord_listener import create_discord_listener, DiscordListener
 from .ha_webhook import HAWebhookClient
@@ -22,6 +30,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Resolved config path -> (mtime, parsed config) so unchanged files aren't re-parsed.
+# Callers always get their own copy so mutations never leak into the cache.
+_config_cache: Dict[Path, Tuple[float, dict]] = {}
+
 
 def load_config(config_path: str = "config.yaml") -> dict:
     """Load configuration from YAML file."""
@@ -36,8 +48,13 @@ def load_config(config_path: str = "config.yaml") -> dict:
         sys.exit(1)
 
     try:
+        mtime = path.stat().st_mtime
+        cached = _config_cache.get(path.resolve())
+        if cached is not None and cached[0] == mtime:
+            return copy.deepcopy(cached[1])
+
         with open(path) as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=SafeLoader)
     except yaml.YAMLError as e:
         logger.error(f"Invalid YAML in configuration file: {e}")
         sys.exit(1)
@@ -52,6 +69,7 @@ def load_config(config_path: str = "config.yaml") -> dict:
             logger.error(f"Missing required configuration: {field}")
             sys.exit(1)
 
+    _config_cache[path.resolve()] = (mtime, copy.deepcopy(config))
     return config
 
 
@@ -69,12 +87,27 @@ class StockAlertMonitor:
         self._shutdown_event = asyncio.Event()
 
         # Initialize components
+        dedup_config = config.get("deduplication", {})
         self.dedup = DeduplicationEngine(
-            window_minutes=config.get("deduplication", {}).get("window_minutes", 30)
+            window_minutes=dedup_config.get("window_minutes", 30),
+            max_entries=dedup_config.get("max_entries", 10_000),
+        )
+
+        # Shared HTTP session so the store poller and HA webhook reuse
+        # keepalive connections and cached DNS lookups
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=20,
+                ttl_dns_cache=300,
+                use_dns_cache=True,
+                keepalive_timeout=60,
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
         )
 
         self.ha_client = HAWebhookClient(
             webhook_url=config["home_assistant"]["webhook_url"],
+            session=self._session,
             token=config["home_assistant"].get("token"),
         )
 
@@ -86,13 +119,13 @@ class StockAlertMonitor:
         logging.getLogger().setLevel(getattr(logging, log_level))
 
     async def _on_discord_alert(
-        self, product_name: str, product_sku: str, message: str
+        self, product_name: str, product_sku: str, sku_canonical: str, message: str
     ):
         """Handle stock alert from Discord listener."""
         logger.info(f"Discord alert: {product_name} ({product_sku})")
 
-        if not self.dedup.should_alert(product_sku):
-            logger.info(f"Duplicate alert suppressed for {product_sku}")
+        decision = await self.dedup.should_alert(sku_canonical)
+        if not decision.admit:
             return
 
         await self.ha_client.send_alert(
@@ -106,14 +139,15 @@ class StockAlertMonitor:
         self,
         product_name: str,
         product_sku: str,
+        sku_canonical: str,
         url: str,
         quantity: Optional[int],
     ):
         """Handle stock alert from store poller."""
         logger.info(f"Store poller alert: {product_name} ({product_sku})")
 
-        if not self.dedup.should_alert(product_sku):
-            logger.info(f"Duplicate alert suppressed for {product_sku}")
+        decision = await self.dedup.should_alert(sku_canonical)
+        if not decision.admit:
             return
 
         await self.ha_client.send_alert(
@@ -152,6 +186,8 @@ class StockAlertMonitor:
                     sku=p["sku"],
                     name=p["name"],
                     url=p["url"],
+                    add_to_cart_selector=p.get("add_to_cart_selector"),
+                    quantity_selector=p.get("quantity_selector"),
                 )
                 for p in poller_config.get("products", [])
             ]
@@ -160,7 +196,9 @@ class StockAlertMonitor:
                 self.store_poller = StorePoller(
                     products=products,
                     on_stock_alert=self._on_store_alert,
+                    session=self._session,
                     interval_seconds=poller_config.get("interval_seconds", 60),
+                    concurrency=poller_config.get("concurrency", 3),
                 )
                 await self.store_poller.start()
                 logger.info(f"Store poller started, monitoring {len(products)} products")
@@ -181,7 +219,10 @@ class StockAlertMonitor:
         if self.store_poller:
             await self.store_poller.stop()
 
-        await self.ha_client.close()
+        if not self._session.closed:
+            await self._session.close()
+            # Give session time to close gracefully
+            await asyncio.sleep(0.25)
 
         logger.info("Shutdown complete")
 
@@ -232,4 +273,15 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Prefer uvloop's libuv-based event loop when available (not on Windows)
+    uvloop = None
+    if sys.platform != "win32":
+        try:
+            import uvloop
+        except ImportError:
+            pass
+
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -2,17 +2,94 @@
 
 import asyncio
 import logging
-from dataclasses import dataclass
-from typing import Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union
 
 import aiohttp
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
+
+from .deduplication import canonical_sku
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
 # Base URL for Ubiquiti store
 STORE_BASE_URL = "https://store.ui.com"
 
+# Browser-like headers sent with every product page request
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# Stock signals sit near the top of the page; stop reading after this many bytes
+MAX_PAGE_BYTES = 256 * 1024
+READ_CHUNK_BYTES = 8192
+
+# Generic selectors used when a product doesn't configure its own
+ADD_TO_CART_SELECTOR = 'button[data-testid="add-to-cart"]'
+QUANTITY_SELECTOR = '[data-testid="quantity-available"]'
+PRODUCT_INFO_SELECTOR = '[data-testid="product-info"]'
+
+# Common patterns for out-of-stock indicators (lowercase)
+OOS_INDICATORS = (
+    "out of stock",
+    "sold out",
+    "currently unavailable",
+    "notify me",
+    "coming soon",
+)
+
+
+def _build_oos_automaton():
+    """Build an Aho-Corasick automaton matching all OOS indicators in one pass."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for indicator in OOS_INDICATORS:
+        automaton.add_word(indicator, indicator)
+    automaton.make_automaton()
+    return automaton
+
+
+_OOS_AUTOMATON = _build_oos_automaton()
+
+
+def _contains_oos_indicator(text: str) -> bool:
+    """Check lowercased page text for any out-of-stock indicator."""
+    if _OOS_AUTOMATON is not None:
+        return next(_OOS_AUTOMATON.iter(text), None) is not None
+    return any(indicator in text for indicator in OOS_INDICATORS)
+
+
+def _is_valid_selector(selector: str) -> bool:
+    """Check that a CSS selector can be compiled by the HTML parser."""
+    try:
+        LexborHTMLParser("").css_first(selector)
+    except Exception:
+        return False
+    return True
+
+
+def _extract_quantity(tree: LexborHTMLParser, selector: str) -> Optional[int]:
+    """Extract the available quantity from the page, if shown."""
+    quantity_elem = tree.css_first(selector)
+    if quantity_elem is not None:
+        try:
+            return int(quantity_elem.text(strip=True).split()[0])
+        except (ValueError, IndexError):
+            pass
+    return None
+
 
 @dataclass
 class ProductConfig:
@@ -21,6 +98,15 @@ class ProductConfig:
     sku: str
     name: str
     url: str
+    # Optional CSS selectors for this product's page layout. When set, a
+    # specialized parser is used before falling back to the generic one.
+    add_to_cart_selector: Optional[str] = None
+    quantity_selector: Optional[str] = None
+    # SKU normalized with canonical_sku(), used as the deduplication key
+    sku_canonical: str = field(init=False)
+
+    def __post_init__(self):
+        self.sku_canonical = canonical_sku(self.sku)
 
 
 @dataclass
@@ -45,8 +131,10 @@ class StorePoller:
     def __init__(
         self,
         products: List[ProductConfig],
-        on_stock_alert: Callable[[str, str, str, Optional[int]], Awaitable[None]],
+        on_stock_alert: Callable[[str, str, str, str, Optional[int]], Awaitable[None]],
+        session: aiohttp.ClientSession,
         interval_seconds: int = 60,
+        concurrency: int = 3,
     ):
         """
         Initialize the store poller.
@@ -54,36 +142,42 @@ class StorePoller:
         Args:
             products: List of products to monitor
             on_stock_alert: Async callback when stock detected.
-                           Called with (product_name, product_sku, url, quantity)
+                           Called with (product_name, product_sku,
+                           sku_canonical, url, quantity)
+            session: Shared HTTP session (owned and closed by the caller)
             interval_seconds: Polling interval (minimum 60 to avoid rate limiting)
+            concurrency: Maximum number of product pages fetched at once
         """
-        self.products = products
+        self.products = [self._validate_selectors(product) for product in products]
         self.on_stock_alert = on_stock_alert
         self.interval_seconds = max(60, interval_seconds)  # Enforce minimum
 
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._session = session
         self._running = False
         self._task: Optional[asyncio.Task] = None
 
+        # Limit concurrent fetches against the store to avoid rate limiting
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+
         # Track previous states to detect changes
         self._previous_states: Dict[str, bool] = {}
 
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """Get or create HTTP session."""
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30),
-                headers={
-                    "User-Agent": (
-                        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/120.0.0.0 Safari/537.36"
-                    ),
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                }
-            )
-        return self._session
+        # Validators and last parsed status per SKU for conditional GETs
+        self._etag: Dict[str, str] = {}
+        self._last_mod: Dict[str, str] = {}
+        self._last_status: Dict[str, ProductStatus] = {}
+
+        # Products already warned about inconclusive truncated pages
+        self._truncation_warned: Set[str] = set()
+
+        # Specialized parsers for products with known page selectors
+        self._parsers: Dict[
+            str, Callable[[LexborHTMLParser], Optional[ProductStatus]]
+        ] = {
+            product.sku: self._make_product_parser(product)
+            for product in self.products
+            if product.add_to_cart_selector
+        }
 
     async def check_product(self, product: ProductConfig) -> ProductStatus:
         """
@@ -95,12 +189,22 @@ class StorePoller:
         Returns:
             ProductStatus with current availability
         """
-        session = await self._get_session()
+        # Only revalidate when we have a parsed status to fall back on
+        headers = dict(REQUEST_HEADERS)
+        if product.sku in self._last_status:
+            if product.sku in self._etag:
+                headers["If-None-Match"] = self._etag[product.sku]
+            if product.sku in self._last_mod:
+                headers["If-Modified-Since"] = self._last_mod[product.sku]
 
         try:
-            async with session.get(
-                product.url, timeout=aiohttp.ClientTimeout(total=15)
+            async with self._session.get(
+                product.url, headers=headers, timeout=aiohttp.ClientTimeout(total=15)
             ) as response:
+                if response.status == 304:
+                    logger.debug("Product %s unchanged (HTTP 304)", product.name)
+                    return self._last_status[product.sku]
+
                 if response.status != 200:
                     logger.warning(
                         f"Failed to fetch {product.name}: HTTP {response.status}"
@@ -112,8 +216,56 @@ class StorePoller:
                         in_stock=False,
                     )
 
-                html = await response.text()
-                return self._parse_product_page(product, html)
+                # Keep at most MAX_PAGE_BYTES but drain the rest of the body,
+                # so the connection goes back to the keepalive pool
+                html = bytearray()
+                truncated = False
+                async for chunk in response.content.iter_chunked(READ_CHUNK_BYTES):
+                    remaining = MAX_PAGE_BYTES - len(html)
+                    if remaining <= 0:
+                        truncated = True
+                    elif len(chunk) > remaining:
+                        html += chunk[:remaining]
+                        truncated = True
+                    else:
+                        html += chunk
+
+                status = self._parse_product_page(
+                    product, bytes(html), truncated=truncated
+                )
+                if status is None:
+                    # Truncated before any stock signal; keep the previous
+                    # status and don't cache this result for conditional GETs
+                    if product.sku not in self._truncation_warned:
+                        self._truncation_warned.add(product.sku)
+                        logger.warning(
+                            f"Page for {product.name} truncated at {MAX_PAGE_BYTES} "
+                            "bytes before any stock indicator; keeping previous status"
+                        )
+                    previous = self._last_status.get(product.sku)
+                    if previous is not None:
+                        return previous
+                    return ProductStatus(
+                        sku=product.sku,
+                        name=product.name,
+                        url=product.url,
+                        in_stock=self._previous_states.get(product.sku, False),
+                    )
+
+                # Remember validators so the next poll can be a conditional GET
+                self._last_status[product.sku] = status
+                etag = response.headers.get("ETag")
+                if etag:
+                    self._etag[product.sku] = etag
+                else:
+                    self._etag.pop(product.sku, None)
+                last_modified = response.headers.get("Last-Modified")
+                if last_modified:
+                    self._last_mod[product.sku] = last_modified
+                else:
+                    self._last_mod.pop(product.sku, None)
+
+                return status
 
         except aiohttp.ClientError as e:
             logger.error(f"Network error checking {product.name}: {e}")
@@ -132,19 +284,26 @@ class StorePoller:
                 in_stock=False,
             )
 
-    def _parse_product_page(self, product: ProductConfig, html: str) -> ProductStatus:
+    def _parse_product_page(
+        self,
+        product: ProductConfig,
+        html: Union[str, bytes],
+        truncated: bool = False,
+    ) -> Optional[ProductStatus]:
         """
         Parse product page HTML to determine stock status.
 
         Args:
             product: Product configuration
-            html: Page HTML content
+            html: Page HTML content (possibly truncated to MAX_PAGE_BYTES)
+            truncated: Whether html was cut off at MAX_PAGE_BYTES
 
         Returns:
-            ProductStatus with parsed availability
+            ProductStatus with parsed availability, or None if a truncated
+            page shows neither an add-to-cart button nor out-of-stock text
         """
         try:
-            soup = BeautifulSoup(html, "html.parser")
+            tree = LexborHTMLParser(html)
         except Exception as e:
             logger.error(f"Error parsing HTML for {product.name}: {e}")
             return ProductStatus(
@@ -154,40 +313,57 @@ class StorePoller:
                 in_stock=False,
             )
 
-        # Common patterns for out-of-stock indicators
-        out_of_stock_indicators = [
-            "out of stock",
-            "sold out",
-            "currently unavailable",
-            "notify me",
-            "coming soon",
-        ]
+        # Try the product's specialized parser first, on the same tree
+        parser = self._parsers.get(product.sku)
+        if parser is not None:
+            status = parser(tree)
+            if status is not None:
+                return status
 
         # Check for add to cart button (indicates in stock)
-        add_to_cart = soup.find("button", {"data-testid": "add-to-cart"})
+        add_to_cart = tree.css_first(ADD_TO_CART_SELECTOR)
         if add_to_cart is None:
-            add_to_cart = soup.find("button", string=lambda x: x and "add to cart" in x.lower())
-
-        # Check page text for out of stock indicators
-        page_text = soup.get_text().lower()
-        is_out_of_stock = any(indicator in page_text for indicator in out_of_stock_indicators)
+            for button in tree.css("button"):
+                if "add to cart" in button.text(deep=True).lower():
+                    add_to_cart = button
+                    break
+
+        # Check page text for out of stock indicators. Without a button the
+        # product is out of stock regardless, so only scan when one was found.
+        is_out_of_stock = False
+        if add_to_cart is not None:
+            # Stock text sits in the product info block; scan only that region
+            # and fall back to the whole page when the block isn't present.
+            region = tree.css_first(PRODUCT_INFO_SELECTOR)
+            if region is None:
+                region = tree.body if tree.body is not None else tree.root
+            if region is not None:
+                region_text = region.text(deep=True, separator=" ").lower()
+                is_out_of_stock = _contains_oos_indicator(region_text)
+        elif truncated:
+            # The button may simply be past the cut-off; only out-of-stock
+            # text makes a truncated page conclusive
+            root = tree.body if tree.body is not None else tree.root
+            if root is not None:
+                page_text = root.text(deep=True, separator=" ").lower()
+                is_out_of_stock = _contains_oos_indicator(page_text)
+            if not is_out_of_stock:
+                return None
 
         # Determine stock status
         in_stock = add_to_cart is not None and not is_out_of_stock
 
         # Try to extract quantity if available
-        quantity = None
-        quantity_elem = soup.find(attrs={"data-testid": "quantity-available"})
-        if quantity_elem:
-            try:
-                quantity = int(quantity_elem.get_text(strip=True).split()[0])
-            except (ValueError, IndexError):
-                pass
+        quantity = _extract_quantity(
+            tree, product.quantity_selector or QUANTITY_SELECTOR
+        )
 
         logger.debug(
-            f"Product {product.name}: in_stock={in_stock}, "
-            f"add_to_cart={'found' if add_to_cart else 'not found'}, "
-            f"out_of_stock_text={is_out_of_stock}"
+            "Product %s: in_stock=%s, add_to_cart=%s, out_of_stock_text=%s",
+            product.name,
+            in_stock,
+            "found" if add_to_cart is not None else "not found",
+            is_out_of_stock,
         )
 
         return ProductStatus(
@@ -198,10 +374,96 @@ class StorePoller:
             quantity=quantity,
         )
 
+    @staticmethod
+    def _validate_selectors(product: ProductConfig) -> ProductConfig:
+        """
+        Drop configured selectors that the HTML parser can't compile.
+
+        Args:
+            product: Product configuration
+
+        Returns:
+            The product, or a copy without its invalid selectors
+        """
+        changes = {}
+        for name in ("add_to_cart_selector", "quantity_selector"):
+            selector = getattr(product, name)
+            if selector and not _is_valid_selector(selector):
+                logger.warning(
+                    f"Invalid {name} for {product.name}: {selector!r}; ignoring it"
+                )
+                changes[name] = None
+        return replace(product, **changes) if changes else product
+
+    def _make_product_parser(
+        self, product: ProductConfig
+    ) -> Callable[[LexborHTMLParser], Optional[ProductStatus]]:
+        """
+        Build a parser specialized to a product's configured selectors.
+
+        The returned parser only looks up the product's own add-to-cart
+        button and skips the whole-page text scan. It returns None when the
+        button isn't found (layout changed, page error), so
+        _parse_product_page falls back to the generic checks on the same tree.
+
+        Args:
+            product: Product configuration with add_to_cart_selector set
+
+        Returns:
+            Parser taking the parsed page and returning a ProductStatus or None
+        """
+        add_to_cart_selector = product.add_to_cart_selector
+        quantity_selector = product.quantity_selector or QUANTITY_SELECTOR
+
+        def parse(tree: LexborHTMLParser) -> Optional[ProductStatus]:
+            try:
+                add_to_cart = tree.css_first(add_to_cart_selector)
+            except Exception as e:
+                logger.debug("Specialized parser failed for %s: %s", product.name, e)
+                return None
+
+            if add_to_cart is None:
+                return None
+
+            # A disabled or relabelled button still means out of stock
+            in_stock = "disabled" not in add_to_cart.attributes and not (
+                _contains_oos_indicator(add_to_cart.text(deep=True).lower())
+            )
+
+            logger.debug(
+                "Product %s: in_stock=%s (selector %s)",
+                product.name,
+                in_stock,
+                add_to_cart_selector,
+            )
+
+            return ProductStatus(
+                sku=product.sku,
+                name=product.name,
+                url=product.url,
+                in_stock=in_stock,
+                quantity=_extract_quantity(tree, quantity_selector),
+            )
+
+        return parse
+
+    async def _guarded_check(self, product: ProductConfig) -> ProductStatus:
+        """Check a product while holding the fetch semaphore."""
+        async with self._sem:
+            return await self.check_product(product)
+
     async def _poll_once(self):
         """Perform one polling cycle for all products."""
-        for product in self.products:
-            status = await self.check_product(product)
+        # Fetch all products concurrently; the semaphore paces requests
+        results = await asyncio.gather(
+            *(self._guarded_check(product) for product in self.products),
+            return_exceptions=True,
+        )
+
+        for product, status in zip(self.products, results):
+            if isinstance(status, BaseException):
+                logger.error(f"Error checking {product.name}: {status}")
+                continue
 
             # Get previous state (default to False to trigger on first detection)
             was_in_stock = self._previous_states.get(product.sku, False)
@@ -217,14 +479,15 @@ class StorePoller:
                 )
                 try:
                     await self.on_stock_alert(
-                        status.name, status.sku, status.url, status.quantity
+                        status.name,
+                        status.sku,
+                        product.sku_canonical,
+                        status.url,
+                        status.quantity,
                     )
                 except Exception as e:
                     logger.error(f"Error in stock alert callback: {e}")
 
-            # Small delay between products to avoid rate limiting
-            await asyncio.sleep(2)
-
     async def _poll_loop(self):
         """Main polling loop."""
         logger.info(
@@ -263,11 +526,6 @@ class StorePoller:
             except (asyncio.CancelledError, asyncio.TimeoutError):
                 pass
 
-        if self._session and not self._session.closed:
-            await self._session.close()
-            # Give session time to close gracefully
-            await asyncio.sleep(0.25)
-
         logger.info("Store poller stopped")
 
     def get_status(self) -> Dict[str, bool]: